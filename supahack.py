@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 st.set_page_config(page_title="SupaHack - Supabase REST Explorer", layout="wide")
 st.title("🔎 SupaHack - Supabase REST Explorer (PostgREST)")
@@ -71,7 +72,7 @@ def parse_tables_from_openapi(oa: dict):
         names.add(seg)
     return sorted(names)
 
-def extract_columns_from_openapi(oa: dict, table: str, schema: str):
+def _openapi_table_properties(oa: dict, table: str, schema: str):
     comps = (oa.get("components", {}) or {}).get("schemas", {}) or {}
     candidates = [
         f"{schema}_{table}",
@@ -80,16 +81,41 @@ def extract_columns_from_openapi(oa: dict, table: str, schema: str):
         f"{table}_insert",
         f"{table}_update",
     ]
-    found_columns = set()
+    found_props = {}
     
-    # Collect columns from all matching schemas
+    # Collect column definitions from all matching schemas
     for cand in candidates:
         if cand in comps and isinstance(comps[cand], dict):
             props = comps[cand].get("properties", {}) or {}
-            if props:
-                found_columns.update(props.keys())
+            for name, prop in props.items():
+                found_props.setdefault(name, prop if isinstance(prop, dict) else {})
     
-    return sorted(list(found_columns)) if found_columns else None
+    return found_props
+
+def extract_columns_from_openapi(oa: dict, table: str, schema: str):
+    found_columns = _openapi_table_properties(oa, table, schema)
+    return sorted(found_columns) if found_columns else None
+
+# Query keys PostgREST treats as control parameters rather than column filters
+POSTGREST_RESERVED_PARAMS = {"select", "columns", "order", "limit", "offset", "on_conflict", "and", "or", "not"}
+
+def pick_probe_columns(oa: dict, table: str, schema: str):
+    """Pick safe (filter column, update body column) for the write probes"""
+    props = _openapi_table_properties(oa, table, schema)
+    safe = [
+        name for name in sorted(props)
+        if name.lower() not in POSTGREST_RESERVED_PARAMS and name.replace("_", "").isalnum()
+    ]
+    if not safe:
+        return None, None
+
+    pks = [name for name in safe if "<pk/>" in (props[name].get("description") or "")]
+    filter_col = pks[0] if pks else safe[0]
+
+    plain = [name for name in safe if (props[name].get("format") or "").lower() != "tsvector"]
+    no_default = [name for name in plain if name not in pks and "default" not in props[name]]
+    body_col = (no_default or pks or plain or [None])[0]
+    return filter_col, body_col
 
 def get_all_schema_names(oa: dict, table: str, schema: str):
     """Get all schema names related to the table for debugging"""
@@ -203,6 +229,118 @@ def get_all_table_counts(base_url, api_key, bearer, schema, tables):
     progress_placeholder.empty()
     return counts
 
+def _permission_status(r):
+    """Map a probe response to a grant label"""
+    if r is None:
+        return "n/a"
+    if r.ok:
+        return "granted"
+    if r.status_code in (401, 403, 405):
+        return "denied"
+    if r.status_code == 404:
+        return "not found"
+    return f"error {r.status_code}"
+
+def probe_table_permissions(base_url, table, api_key, bearer, schema, columns=(None, None), http=None):
+    """Run zero-row read/insert/update/delete probes against a table"""
+    http = http or requests
+    url = f"{base_url.rstrip('/')}/{table}"
+    filter_col, body_col = columns
+    result = {
+        "table": table, "read": "n/a", "rows (planned)": None,
+        "insert": "n/a", "update": "n/a", "delete": "n/a", "rollback": "n/a",
+    }
+
+    def track_rollback(r):
+        if not r.ok:
+            return
+        if "tx=rollback" in (r.headers.get("Preference-Applied") or ""):
+            if result["rollback"] == "n/a":
+                result["rollback"] = "applied"
+        else:
+            result["rollback"] = "ignored"
+
+    # READ: HEAD with limit=0 only returns headers and a planner row estimate
+    try:
+        headers = _headers(api_key, bearer, schema)
+        headers["Prefer"] = "count=planned"
+        r = http.head(url, headers=headers, params={"limit": 0}, timeout=10)
+        result["read"] = _permission_status(r)
+    except Exception:
+        result["read"] = "error"
+        r = None
+
+    cr = r.headers.get("Content-Range") if r is not None and r.ok else None
+    if cr and "/" in cr:
+        try:
+            total_part = cr.split("/")[-1]
+            if total_part != "*":
+                result["rows (planned)"] = int(total_part)
+        except Exception:
+            pass
+
+    write_headers = _headers(api_key, bearer, schema)
+    write_headers["Content-Profile"] = write_headers["Accept-Profile"]
+    write_headers["Content-Type"] = "application/json"
+    write_headers["Prefer"] = "tx=rollback, return=minimal"
+
+    try:
+        r = http.post(url, headers=write_headers, json=[], timeout=10)
+        result["insert"] = _permission_status(r)
+        track_rollback(r)
+    except Exception:
+        result["insert"] = "error"
+
+    # UPDATE/DELETE need a safe column for a filter that can never match a row;
+    # a single empty IN list keeps that true even if repeated keys get collapsed
+    if not filter_col:
+        return result
+    no_match = {filter_col: "in.()"}
+
+    if body_col:
+        try:
+            r = http.patch(url, headers=write_headers, json={body_col: None}, params=no_match, timeout=10)
+            result["update"] = _permission_status(r)
+            track_rollback(r)
+        except Exception:
+            result["update"] = "error"
+
+    try:
+        r = http.delete(url, headers=write_headers, params=no_match, timeout=10)
+        result["delete"] = _permission_status(r)
+        track_rollback(r)
+    except Exception:
+        result["delete"] = "error"
+
+    return result
+
+def sweep_table_permissions(base_url, api_key, bearer, schema, tables, table_columns, max_workers=16):
+    """Probe permissions for all tables concurrently, returning one row per table"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    results = []
+    progress_bar = st.progress(0.0, text="Sweeping table permissions...")
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    probe_table_permissions, base_url, table, api_key, bearer, schema,
+                    table_columns.get(table, (None, None)), session,
+                )
+                for table in tables
+            ]
+            for i, future in enumerate(as_completed(futures)):
+                results.append(future.result())
+                progress_bar.progress((i + 1) / len(futures), text=f"Sweeping table permissions... {i+1}/{len(futures)}")
+    finally:
+        session.close()
+        progress_bar.empty()
+
+    return sorted(results, key=lambda row: row["table"])
+
 # Connect & cache OpenAPI - only when Connect button is clicked
 if connect:
     if base_url and (api_key or bearer):
@@ -212,6 +350,7 @@ if connect:
                 st.session_state.tables = parse_tables_from_openapi(st.session_state.openapi)
                 # Clear cached counts when connecting to a new database
                 get_all_table_counts.clear()
+                st.session_state.pop("permission_sweep", None)
         except Exception as e:
             st.error(f"Failed to fetch OpenAPI: {e}")
     else:
@@ -291,6 +430,7 @@ if refresh_tables:
         tables = st.session_state.tables
         # Clear the cached counts so they get refreshed
         get_all_table_counts.clear()
+        st.session_state.pop("permission_sweep", None)
         st.success("Table list refreshed.")
         st.rerun()
     except Exception as e:
@@ -310,6 +450,60 @@ if 'load_counts_btn' in locals() and load_counts_btn:
     st.success("Row counts loaded!")
     st.rerun()
 
+# Permission sweep across all tables
+with st.expander("🛡️ Permission sweep (table grants, RLS not tested)", expanded=False):
+    st.caption(
+        "Probes every table for READ / INSERT / UPDATE / DELETE grants with zero-row requests: "
+        "reads use HEAD with limit=0, inserts post an empty array, updates/deletes use an empty `in.()` filter "
+        "on a safe column (primary key preferred) that matches no rows. "
+        "'granted' only means the role has the table privilege: no row is checked, so RLS `USING` / `WITH CHECK` "
+        "policies are never exercised and may still hide or block every real row. "
+        "UPDATE sets a single column, so 'denied' can mean only that column lacks a column-level grant, "
+        "and 'error' usually means that column cannot be written (e.g. generated)."
+    )
+    st.caption(
+        "⚠️ Not strictly non-destructive: zero-row writes still fire statement-level triggers "
+        "(audit rows, notifications, webhooks). These only roll back if the server applies `Prefer: tx=rollback`, "
+        "which hosted Supabase ignores by default — see the 'rollback' column."
+    )
+    sc1, sc2 = st.columns([1, 1])
+    with sc1:
+        sweep_workers = st.number_input("Concurrent requests", min_value=1, max_value=64, value=16, step=1)
+    with sc2:
+        run_sweep = st.button("Run permission sweep", disabled=not (tables and base_url and (api_key or bearer)))
+
+    sweep_context = (base_url, schema, api_key, bearer)
+    if run_sweep:
+        table_columns = {table: pick_probe_columns(oa, table, schema) for table in tables}
+        st.session_state.permission_sweep = {
+            "context": sweep_context,
+            "rows": sweep_table_permissions(
+                base_url, api_key, bearer, schema, tables, table_columns, int(sweep_workers)
+            ),
+        }
+
+    # Drop results produced with a different URL, schema or key
+    sweep = st.session_state.get("permission_sweep")
+    if sweep and sweep["context"] != sweep_context:
+        st.session_state.pop("permission_sweep", None)
+        sweep = None
+        st.info("Connection settings changed since the last sweep — run it again for the current key.")
+
+    sweep_rows = sweep["rows"] if sweep else None
+    if sweep_rows:
+        sweep_df = pd.DataFrame(sweep_rows)
+        sweep_df["rows (planned)"] = sweep_df["rows (planned)"].astype("Int64")
+        perm_cols = ["read", "insert", "update", "delete"]
+        granted = {c: int((sweep_df[c] == "granted").sum()) for c in perm_cols}
+        st.write("Granted — " + " · ".join(f"**{c.upper()}**: {n}/{len(sweep_df)}" for c, n in granted.items()))
+        st.dataframe(sweep_df, use_container_width=True, hide_index=True)
+        sweep_csv = sweep_df.to_csv(index=False).encode("utf-8")
+        st.download_button("Download permission matrix", data=sweep_csv, file_name="permissions.csv", mime="text/csv")
+        if (sweep_df[["update", "delete"]] == "n/a").any().any():
+            st.caption("UPDATE/DELETE show 'n/a' for tables without a safe column definition in the OpenAPI schema.")
+        if (sweep_df["rollback"] == "ignored").any():
+            st.warning("The server ignored `Prefer: tx=rollback` for some tables: any trigger side effects of the probes were committed.")
+
 if not selected_table:
     st.stop()
 